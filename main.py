@@ -7,6 +7,9 @@ Django Tenants ToolBox - 主入口點
 
 import os
 import sys
+import json
+import uuid
+import hashlib
 import subprocess
 import tempfile
 import threading
@@ -39,6 +42,33 @@ VENV_ACTIVATE = None
 ENV_FILE = None
 ENV_VARS = {}
 
+# 事件記錄與指標輸出設定
+EVENTS_FILE_NAME = "toolbox_events.jsonl"
+METRICS_DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+_EVENTS_LOCK = threading.Lock()
+_METRICS_STATE = {}  # 指標累計狀態，只讀取事件記錄檔新增的部分
+
+# 檢查結果快取設定
+CHECK_CACHE_FILE_NAME = "toolbox_check_cache.json"
+FINGERPRINT_EXTENSIONS = (".py", ".cfg", ".ini", ".toml")
+FINGERPRINT_SKIP_DIRS = {
+    ".git",
+    ".hg",
+    ".svn",
+    "__pycache__",
+    "node_modules",
+    ".tox",
+    ".nox",
+    ".mypy_cache",
+    ".pytest_cache",
+    "staticfiles",
+    "media",
+}
+
+# 啟動效能分析設定
+STARTUP_PROFILE_DIR_NAME = "startup_profiles"
+STARTUP_PROFILE_MARKER = "__TOOLBOX_STARTUP_PROFILE__"
+
 
 def find_manage_py(start_dir):
     """從給定目錄開始，尋找 manage.py 文件"""
@@ -191,6 +221,295 @@ def load_env_file(env_file_path):
         return False, f"加載環境變數時出錯: {str(e)}"
 
 
+# 事件記錄與指標相關函數
+def get_events_file():
+    """取得 JSON-lines 事件記錄檔路徑（可用 TOOLBOX_EVENTS_FILE 覆寫）"""
+    return os.environ.get("TOOLBOX_EVENTS_FILE") or os.path.join(
+        BASE_DIR, EVENTS_FILE_NAME
+    )
+
+
+def get_metrics_file():
+    """取得 Prometheus textfile 指標檔路徑（未設定 TOOLBOX_METRICS_FILE 則不輸出）"""
+    return os.environ.get("TOOLBOX_METRICS_FILE") or None
+
+
+def new_run_id():
+    """產生一次操作的執行編號"""
+    return uuid.uuid4().hex[:12]
+
+
+def emit_event(event, run_id, action, **fields):
+    """
+    寫入一筆 JSON-lines 事件
+
+    事件種類:
+    - start: 操作開始（由工具箱寫入）
+    - progress: 開始執行某個命令（由 .bat 寫入）
+    - result: 命令或單一租戶的結果，含結束碼
+    - end: 操作結束，含整體結束碼
+    """
+    record = {
+        "ts": round(time.time(), 3),
+        "event": event,
+        "run_id": run_id,
+        "action": action,
+    }
+    record.update({name: value for name, value in fields.items() if value is not None})
+
+    try:
+        with _EVENTS_LOCK:
+            with open(get_events_file(), "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        # 事件記錄失敗不影響操作本身
+        pass
+
+
+def bat_event_lines(
+    event,
+    run_id,
+    action,
+    exit_code=None,
+    since=None,
+    save_as=(),
+    capture=True,
+    **fields,
+):
+    """
+    產生在 .bat 中寫入事件的命令行
+
+    以 PowerShell 取得 epoch 毫秒寫入 ts 欄位（與工具箱寫入的事件相同），
+    since 為先前以 save_as 保存時間的批次變數名稱，用來寫入 seconds 欄位。
+    有 since 時以 PowerShell 行程的啟動時間作為結束時間，不計入 PowerShell 本身的啟動耗時
+    （僅含 for /f 啟動子 cmd 的數毫秒）。
+    capture=False 時沿用上一個事件取得的時間，不再啟動 PowerShell。
+    exit_code 可傳入批次變數（例如 "%TOOLBOX_RC%"），會在呼叫 PowerShell 前先保存。
+    欄位值請使用不含引號的簡單字串或數字。
+    """
+    record = {"event": event, "run_id": run_id, "action": action}
+    record.update({name: value for name, value in fields.items() if value is not None})
+
+    lines = []
+    if exit_code is not None:
+        lines.append(f'set "TOOLBOX_EXIT={exit_code}"')
+
+    # 同時取得現在時間與距離 since 的毫秒數，避免批次 set /a 的 32 位元溢位
+    if capture:
+        if since:
+            now = "([DateTimeOffset](Get-Process -Id $PID).StartTime)"
+        else:
+            now = "[DateTimeOffset]::Now"
+        since_value = f"0%{since}%" if since else "0"
+        lines.append(
+            "for /f \"tokens=1,2\" %%a in ('powershell -NoProfile -Command "
+            f"\"$n={now}.ToUnixTimeMilliseconds(); "
+            f"[string]$n + [char]32 + [string]($n - {since_value})\"') "
+            'do (set "TOOLBOX_NOW=%%a" & set "TOOLBOX_MS=%%b")'
+        )
+    for name in save_as:
+        lines.append(f'set "{name}=%TOOLBOX_NOW%"')
+
+    # 去掉結尾的 }，補上批次變數欄位
+    body = json.dumps(record, ensure_ascii=False)[:-1].replace("%", "%%")
+    body += ', "ts": %TOOLBOX_NOW:~0,-3%.%TOOLBOX_NOW:~-3%'
+    if since:
+        lines.append(
+            'set /a "TOOLBOX_S=TOOLBOX_MS/1000, TOOLBOX_F=1000+TOOLBOX_MS%%1000"'
+        )
+        body += ', "seconds": %TOOLBOX_S%.%TOOLBOX_F:~1%'
+    if exit_code is not None:
+        body += ', "exit_code": %TOOLBOX_EXIT%'
+
+    events_file = get_events_file().replace("%", "%%")
+    lines.append(f'>>"{events_file}" echo {body}}}')
+    return "\n".join(lines)
+
+
+def _new_metrics_state(events_file=None):
+    """建立空的指標累計狀態"""
+    return {
+        "events_file": events_file,
+        "offset": 0,
+        "actions": {},
+        "failures": {},
+        "durations": {},
+        "tenant_seconds": {},
+        "tenant_last": {},
+        "tenant_failures": {},
+    }
+
+
+def _observe(histograms, action, value):
+    """將一個觀測值累加到直方圖"""
+    histogram = histograms.setdefault(
+        action,
+        {"buckets": [0] * len(METRICS_DURATION_BUCKETS), "sum": 0.0, "count": 0},
+    )
+    for position, bucket in enumerate(METRICS_DURATION_BUCKETS):
+        if value <= bucket:
+            histogram["buckets"][position] += 1
+    histogram["sum"] += value
+    histogram["count"] += 1
+
+
+def apply_metrics_event(state, record):
+    """將單一事件累加到指標狀態"""
+    action = record.get("action") or "unknown"
+    event = record.get("event")
+    exit_code = record.get("exit_code")
+    seconds = record.get("seconds")
+    if not isinstance(seconds, (int, float)):
+        seconds = None
+
+    if event == "start":
+        state["actions"][action] = state["actions"].get(action, 0) + 1
+    elif event == "end":
+        if exit_code not in (None, 0):
+            state["failures"][action] = state["failures"].get(action, 0) + 1
+        if seconds is not None:
+            _observe(state["durations"], action, seconds)
+    elif event == "result" and record.get("schema"):
+        if exit_code not in (None, 0):
+            state["tenant_failures"][action] = (
+                state["tenant_failures"].get(action, 0) + 1
+            )
+        if seconds is not None and action.startswith("migrate"):
+            _observe(state["tenant_seconds"], action, seconds)
+            state["tenant_last"][(action, record["schema"])] = seconds
+
+
+def update_metrics_state(state, events_file=None):
+    """
+    只讀取事件記錄檔中上次之後新增的完整行，累加到指標狀態
+
+    記錄檔被換掉或截短時會重新從頭累計。
+    """
+    events_file = events_file or get_events_file()
+    try:
+        size = os.path.getsize(events_file)
+    except OSError:
+        return state
+
+    if state.get("events_file") != events_file or size < state.get("offset", 0):
+        state.clear()
+        state.update(_new_metrics_state(events_file))
+
+    with open(events_file, "rb") as f:
+        f.seek(state["offset"])
+        data = f.read()
+
+    # 其他視窗可能正在寫入，最後一行不完整時留到下次再讀
+    complete = data.rfind(b"\n") + 1
+    for line in data[:complete].splitlines():
+        try:
+            record = json.loads(line.decode("utf-8", errors="replace"))
+        except ValueError:
+            continue
+        if isinstance(record, dict):
+            apply_metrics_event(state, record)
+
+    state["offset"] += complete
+    return state
+
+
+def _metric_labels(**labels):
+    """組成 Prometheus 標籤字串"""
+    parts = []
+    for name, value in labels.items():
+        value = (
+            str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _histogram_lines(name, histograms):
+    """產生直方圖的 bucket / sum / count 行"""
+    lines = []
+    for action, histogram in sorted(histograms.items()):
+        for bucket, count in zip(METRICS_DURATION_BUCKETS, histogram["buckets"]):
+            lines.append(
+                f"{name}_bucket{_metric_labels(action=action, le=bucket)} {count}"
+            )
+        labels = _metric_labels(action=action, le="+Inf")
+        lines.append(f"{name}_bucket{labels} {histogram['count']}")
+        labels = _metric_labels(action=action)
+        lines.append(f"{name}_sum{labels} {histogram['sum']:.3f}")
+        lines.append(f"{name}_count{labels} {histogram['count']}")
+    return lines
+
+
+def build_metrics_text(state):
+    """將累計的指標狀態轉為 Prometheus textfile 格式"""
+    lines = [
+        "# HELP toolbox_actions_total 工具箱操作執行次數",
+        "# TYPE toolbox_actions_total counter",
+    ]
+    for action, count in sorted(state["actions"].items()):
+        lines.append(f"toolbox_actions_total{_metric_labels(action=action)} {count}")
+
+    lines += [
+        "# HELP toolbox_action_failures_total 工具箱操作失敗次數",
+        "# TYPE toolbox_action_failures_total counter",
+    ]
+    for action in sorted(set(state["actions"]) | set(state["failures"])):
+        count = state["failures"].get(action, 0)
+        lines.append(
+            f"toolbox_action_failures_total{_metric_labels(action=action)} {count}"
+        )
+
+    lines += [
+        "# HELP toolbox_action_duration_seconds 工具箱操作耗時（秒）",
+        "# TYPE toolbox_action_duration_seconds histogram",
+    ]
+    lines += _histogram_lines("toolbox_action_duration_seconds", state["durations"])
+
+    lines += [
+        "# HELP toolbox_tenant_migration_seconds 單一租戶遷移耗時（秒）",
+        "# TYPE toolbox_tenant_migration_seconds histogram",
+    ]
+    lines += _histogram_lines(
+        "toolbox_tenant_migration_seconds", state["tenant_seconds"]
+    )
+
+    lines += [
+        "# HELP toolbox_tenant_migration_last_seconds 各租戶最近一次遷移耗時（秒）",
+        "# TYPE toolbox_tenant_migration_last_seconds gauge",
+    ]
+    for (action, schema), seconds in sorted(state["tenant_last"].items()):
+        labels = _metric_labels(action=action, schema=schema)
+        lines.append(f"toolbox_tenant_migration_last_seconds{labels} {seconds:.3f}")
+
+    lines += [
+        "# HELP toolbox_tenant_failures_total 單一租戶結果失敗次數",
+        "# TYPE toolbox_tenant_failures_total counter",
+    ]
+    for action, count in sorted(state["tenant_failures"].items()):
+        lines.append(
+            f"toolbox_tenant_failures_total{_metric_labels(action=action)} {count}"
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+def export_metrics(metrics_file=None, events_file=None):
+    """將事件記錄累計的指標輸出為 Prometheus textfile（原子性覆寫）"""
+    metrics_file = metrics_file or get_metrics_file()
+    if not metrics_file:
+        return False, "未設定 TOOLBOX_METRICS_FILE，略過指標輸出"
+
+    try:
+        text = build_metrics_text(update_metrics_state(_METRICS_STATE, events_file))
+        temp_path = metrics_file + ".tmp"
+        with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+        os.replace(temp_path, metrics_file)
+        return True, f"已輸出指標: {metrics_file}"
+    except Exception as e:
+        return False, f"輸出指標時發生錯誤: {e}"
+
+
 def create_bat_and_run(
     commands,
     title=None,
@@ -199,6 +518,11 @@ def create_bat_and_run(
     venv_activate=None,
     env_vars=None,
     admin=True,  # 預設使用管理員權限
+    action=None,
+    schema=None,
+    run_id=None,
+    cleanup_files=None,
+    instrument=True,
 ):
     """
     建立臨時 .bat 文件，並在新 CMD 視窗中執行命令
@@ -211,7 +535,18 @@ def create_bat_and_run(
     - venv_activate: 虛擬環境 activate.bat 的路徑
     - env_vars: 環境變數字典
     - admin: 是否以管理員權限執行
+    - action: 事件記錄用的操作名稱
+    - schema: 事件記錄用的租戶 schema（操作只針對單一租戶時）
+    - run_id: 事件記錄用的執行編號（未提供時自動產生）
+    - cleanup_files: 命令執行完畢後由 .bat 刪除的臨時文件
+    - instrument: 是否在 .bat 中記錄結果與結束事件（互動式視窗可關閉）
     """
+    action = action or "command"
+    run_id = run_id or new_run_id()
+    emit_event(
+        "start", run_id, action, title=title, commands=list(commands), schema=schema
+    )
+
     # 創建臨時 .bat 文件
     with tempfile.NamedTemporaryFile(
         suffix=".bat", delete=False, mode="w", encoding="utf-8"
@@ -240,10 +575,41 @@ def create_bat_and_run(
             for name, value in env_vars.items():
                 bat_file.write(f'set "{name}={value}"\n')
 
-        # 寫入要執行的命令
+        # 寫入要執行的命令；整段命令只記錄一組開始與結束事件，避免每行都啟動 PowerShell
         bat_file.write("\n")
+        if instrument:
+            bat_file.write(
+                bat_event_lines(
+                    "progress", run_id, action, save_as=["TOOLBOX_RUN_START"]
+                )
+                + "\n"
+            )
+            bat_file.write('set "TOOLBOX_RC=0"\n')
         for cmd in commands:
             bat_file.write(f"{cmd}\n")
+            if instrument:
+                bat_file.write(
+                    'if not "%ERRORLEVEL%"=="0" set "TOOLBOX_RC=%ERRORLEVEL%"\n'
+                )
+        if instrument:
+            end_fields = {"exit_code": "%TOOLBOX_RC%", "since": "TOOLBOX_RUN_START"}
+            if schema:
+                bat_file.write(
+                    bat_event_lines(
+                        "result", run_id, action, schema=schema, **end_fields
+                    )
+                    + "\n"
+                )
+            bat_file.write(
+                bat_event_lines(
+                    "end", run_id, action, capture=not schema, **end_fields
+                )
+                + "\n"
+            )
+
+        # 刪除執行期間仍需要的臨時文件（例如 Django 腳本）
+        for cleanup_file in cleanup_files or []:
+            bat_file.write(f'del "{cleanup_file}" >nul 2>&1\n')
 
         # 如果需要，添加等待命令
         if wait:
@@ -251,6 +617,9 @@ def create_bat_and_run(
             bat_file.write("echo 命令執行完成。按任意鍵關閉視窗...\n")
             bat_file.write("pause > nul\n")
 
+        # cmd.exe 每執行一行都會重新讀取 .bat，因此由 .bat 在最後一行刪除自己
+        bat_file.write('(goto) 2>nul & del "%~f0"\n')
+
     # 在新 CMD 視窗執行 .bat 文件
     try:
         if admin:
@@ -267,21 +636,105 @@ def create_bat_and_run(
     except Exception as e:
         success = False
         message = f"啟動新視窗時發生錯誤: {e}"
+        emit_event("end", run_id, action, exit_code=-1, error=str(e))
 
-    # 一段時間後自動刪除臨時文件 (避免累積太多)
-    def delete_temp_file():
-        time.sleep(5)
-        try:
-            if os.path.exists(bat_path):
-                os.remove(bat_path)
-        except:
-            pass
-
-    threading.Thread(target=delete_temp_file, daemon=True).start()
+        # 視窗未能啟動時，.bat 與臨時文件不會自行刪除
+        for temp_file in [bat_path] + list(cleanup_files or []):
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
 
     return success, message
 
 
+# Django 腳本相關函數
+# 腳本會在 `manage.py shell -c` 中執行，因此可直接使用已設定好的 Django 環境
+DJANGO_SCRIPT_PRELUDE = """# -*- coding: utf-8 -*-
+# 由 Django Tenants ToolBox 自動產生，執行完畢後會自動刪除
+import json
+import sys
+import threading
+import time
+
+RUN_ID = {run_id!r}
+ACTION = {action!r}
+EVENTS_FILE = {events_file!r}
+PARAMS = {params!r}
+_EVENTS_LOCK = threading.Lock()
+
+
+def _event(event, **fields):
+    record = {{
+        "ts": round(time.time(), 3),
+        "event": event,
+        "run_id": RUN_ID,
+        "action": ACTION,
+    }}
+    record.update({{name: value for name, value in fields.items() if value is not None}})
+    try:
+        with _EVENTS_LOCK:
+            with open(EVENTS_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\\n")
+    except OSError:
+        pass
+
+"""
+
+
+def run_django_script(
+    script_body,
+    title,
+    action,
+    project_dir,
+    venv_activate,
+    env_vars=None,
+    params=None,
+):
+    """
+    將 Django 腳本寫入臨時 .py 文件，並在新 CMD 視窗中以 manage.py shell 執行
+
+    參數:
+    - script_body: 腳本內容（可使用 _event()、PARAMS 等預設變數）
+    - title: CMD 視窗標題
+    - action: 事件記錄用的操作名稱
+    - params: 傳給腳本的參數字典（以 PARAMS 取用）
+    """
+    run_id = new_run_id()
+
+    try:
+        with tempfile.NamedTemporaryFile(
+            suffix=".py", delete=False, mode="w", encoding="utf-8"
+        ) as script_file:
+            script_path = script_file.name
+            script_file.write(
+                DJANGO_SCRIPT_PRELUDE.format(
+                    run_id=run_id,
+                    action=action,
+                    events_file=get_events_file(),
+                    params=params or {},
+                )
+            )
+            script_file.write(script_body)
+    except Exception as e:
+        return False, f"建立 Django 腳本時發生錯誤: {e}"
+
+    return create_bat_and_run(
+        [
+            f"python manage.py shell -c \"exec(open(r'{script_path}', encoding='utf-8').read())\""
+        ],
+        title=title,
+        wait=True,
+        directory=project_dir,
+        venv_activate=venv_activate,
+        env_vars=env_vars,
+        admin=True,  # 使用管理員權限
+        action=action,
+        run_id=run_id,
+        cleanup_files=[script_path],
+    )
+
+
 def select_project_directory():
     """
     彈出文件對話框，讓使用者選擇 Django 項目目錄
@@ -380,6 +833,7 @@ def run_django_server(project_dir, venv_activate, env_vars=None):
     return create_bat_and_run(
         ["python manage.py runserver"],
         title="Django Runserver",
+        action="runserver",
         directory=project_dir,
         venv_activate=venv_activate,
         env_vars=env_vars,
@@ -392,6 +846,7 @@ def run_django_shell(project_dir, venv_activate, env_vars=None):
     return create_bat_and_run(
         ["python manage.py shell"],
         title="Django Shell",
+        action="shell",
         directory=project_dir,
         venv_activate=venv_activate,
         env_vars=env_vars,
@@ -404,6 +859,7 @@ def migrate_schemas_shared(project_dir, venv_activate, env_vars=None):
     return create_bat_and_run(
         ["python manage.py migrate_schemas --shared"],
         title="Django Migrate Schemas (Shared)",
+        action="migrate_shared",
         wait=True,
         directory=project_dir,
         venv_activate=venv_activate,
@@ -412,16 +868,275 @@ def migrate_schemas_shared(project_dir, venv_activate, env_vars=None):
     )
 
 
+# 所有租戶遷移腳本：先遷移共享租戶，再逐一遷移每個租戶並記錄各自的耗時
+MIGRATE_ALL_SCRIPT = r'''
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django_tenants.utils import get_public_schema_name, get_tenant_model
+
+started = time.perf_counter()
+public_schema = get_public_schema_name()
+call_command("migrate_schemas", shared=True, interactive=False)
+
+if getattr(settings, "TENANT_EXECUTOR", "standard") != "standard":
+    # 平行執行器會自行分配租戶，無法逐一計時，直接交給 migrate_schemas
+    call_command("migrate_schemas", tenant=True, interactive=False)
+    sys.exit(0)
+
+schemas = list(
+    get_tenant_model()
+    .objects.exclude(schema_name=public_schema)
+    .order_by("schema_name")
+    .values_list("schema_name", flat=True)
+)
+failed = []
+for position, schema in enumerate(schemas, 1):
+    schema_started = time.perf_counter()
+    exit_code = 0
+    try:
+        connection.set_schema_to_public()
+        call_command("migrate_schemas", schema_name=schema, interactive=False)
+    except Exception as e:
+        exit_code = 1
+        failed.append(schema)
+        print(f"❌ {schema} 遷移失敗: {e}")
+    seconds = time.perf_counter() - schema_started
+    if exit_code == 0:
+        print(f"[{position}/{len(schemas)}] {schema} 遷移完成 ({seconds:.2f}s)")
+    _event("result", schema=schema, seconds=round(seconds, 3), exit_code=exit_code)
+
+connection.set_schema_to_public()
+print(f"\n完成，共耗時 {time.perf_counter() - started:.2f}s，失敗 {len(failed)} 個租戶")
+if failed:
+    print("失敗的租戶: " + ", ".join(failed))
+    sys.exit(1)
+'''
+
+
 def migrate_schemas_all(project_dir, venv_activate, env_vars=None):
-    """執行所有租戶的資料庫遷移"""
-    return create_bat_and_run(
-        ["python manage.py migrate_schemas"],
+    """
+    執行所有租戶的資料庫遷移
+
+    先遷移共享租戶，再逐一以 migrate_schemas --schema 遷移每個租戶，
+    以便記錄每個租戶的遷移耗時（使用平行執行器時改為一次遷移所有租戶）。
+    """
+    return run_django_script(
+        MIGRATE_ALL_SCRIPT,
         title="Django Migrate All Schemas",
-        wait=True,
-        directory=project_dir,
+        action="migrate_all",
+        project_dir=project_dir,
+        venv_activate=venv_activate,
+        env_vars=env_vars,
+    )
+
+
+# 快速遷移腳本：套用到參考租戶並擷取 SQL，再重播到結構相同的租戶
+MIGRATE_FAST_SCRIPT = r'''
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.operations import RunPython, SeparateDatabaseAndState
+from django.db.migrations.recorder import MigrationRecorder
+from django_tenants.utils import get_public_schema_name, get_tenant_model
+
+
+def _has_run_python(operations):
+    """檢查遷移操作中是否含有 RunPython（包含巢狀的 database_operations）"""
+    for operation in operations:
+        if isinstance(operation, RunPython):
+            return True
+        if isinstance(operation, SeparateDatabaseAndState) and _has_run_python(
+            operation.database_operations
+        ):
+            return True
+    return False
+
+
+def _needs_normal_path(migration):
+    """含 RunPython 或非 atomic 的遷移無法以預先產生的 SQL 套用"""
+    return not migration.atomic or _has_run_python(migration.operations)
+
+
+def _applied_migrations(schema):
+    connection.set_schema(schema)
+    return frozenset(MigrationRecorder(connection).applied_migrations())
+
+
+def _record_applied(recorder, plan):
+    for migration, _ in plan:
+        for app_label, name in migration.replaces:
+            recorder.record_applied(app_label, name)
+        recorder.record_applied(migration.app_label, migration.name)
+
+
+def _apply_reference(schema, executor, plan, emit_signal):
+    """
+    以一般方式逐一套用遷移到參考租戶，並擷取實際執行的 SQL
+
+    collect_sql 模式仍會查詢資料庫取得約束名稱，跨多個遷移產生的 SQL 可能不正確，
+    因此改為實際套用到參考租戶，再將 schema editor 執行過的語句重播到其他租戶。
+    """
+    connection.set_schema(schema)
+    statements = []
+    with transaction.atomic():
+        for migration, _ in plan:
+            state = executor.loader.project_state(
+                (migration.app_label, migration.name), at_end=False
+            )
+            with connection.schema_editor(atomic=migration.atomic) as schema_editor:
+                original_execute = schema_editor.execute
+
+                def execute(sql, params=(), original_execute=original_execute):
+                    statements.append((str(sql), list(params) if params else None))
+                    return original_execute(sql, params)
+
+                # 延遲執行的 SQL 也透過 self.execute() 執行，同樣會被擷取
+                schema_editor.execute = execute
+                migration.apply(state, schema_editor)
+        _record_applied(MigrationRecorder(connection), plan)
+    if emit_signal:
+        emit_post_migrate_signal(0, False, connection.alias, plan=plan)
+    return statements
+
+
+def _apply_fast(schema, statements, plan, emit_signal):
+    """在單一交易中重播 SQL 並寫入該租戶的 django_migrations"""
+    connection.set_schema(schema)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for sql, params in statements:
+                cursor.execute(sql, params)
+        _record_applied(MigrationRecorder(connection), plan)
+    if emit_signal:
+        emit_post_migrate_signal(0, False, connection.alias, plan=plan)
+
+
+def _apply_normal(schema):
+    connection.set_schema_to_public()
+    call_command("migrate_schemas", schema_name=schema, interactive=False)
+
+
+started = time.perf_counter()
+public_schema = get_public_schema_name()
+schemas = list(
+    get_tenant_model()
+    .objects.exclude(schema_name=public_schema)
+    .order_by("schema_name")
+    .values_list("schema_name", flat=True)
+)
+print(f"找到 {len(schemas)} 個租戶，正在比對已套用的遷移...")
+
+# 依已套用的遷移將租戶分組，最大的一組視為結構相同的租戶
+groups = {}
+for schema in schemas:
+    groups.setdefault(_applied_migrations(schema), []).append(schema)
+fast_schemas = max(groups.values(), key=len) if groups else []
+normal_schemas = [schema for schema in schemas if schema not in set(fast_schemas)]
+
+plan, fast_plan, statements = [], [], []
+if fast_schemas:
+    connection.set_schema(fast_schemas[0])
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+    # 只有第一個含 RunPython / 非 atomic 遷移之前的部分可以走快速路徑
+    for migration, backwards in plan:
+        if backwards or _needs_normal_path(migration):
+            print(f"遷移 {migration.app_label}.{migration.name} 含 RunPython 或非 atomic，此遷移及之後改用一般路徑")
+            break
+        fast_plan.append((migration, backwards))
+
+# 剩餘的遷移會由一般路徑執行，post_migrate 交給 migrate_schemas 發送，避免重複
+emit_signal = len(fast_plan) == len(plan)
+failed = []
+
+if fast_plan:
+    reference = fast_schemas[0]
+    print(f"正在以一般方式套用到參考租戶 {reference} 並擷取 SQL...")
+    schema_started = time.perf_counter()
+    try:
+        statements = _apply_reference(reference, executor, fast_plan, emit_signal)
+    except Exception as e:
+        print(f"❌ 參考租戶 {reference} 套用失敗，已回滾，所有租戶改用一般路徑: {e}")
+        fast_plan, statements = [], []
+    else:
+        seconds = time.perf_counter() - schema_started
+        print(f"[1/{len(fast_schemas)}] {reference} 參考租戶套用完成 ({seconds:.2f}s)")
+        _event("result", schema=reference, mode="reference", seconds=round(seconds, 3), exit_code=0)
+
+if len(fast_plan) < len(plan):
+    # 剩餘的遷移需要逐一以一般路徑執行
+    normal_schemas = schemas
+if not fast_plan:
+    fast_schemas = []
+
+print(f"待套用遷移: {len(plan)} 個，其中 {len(fast_plan)} 個以快速路徑套用（{len(statements)} 條 SQL）")
+print(f"快速路徑租戶: {len(fast_schemas)} 個，一般路徑租戶: {len(normal_schemas)} 個")
+_event(
+    "progress",
+    stage="plan",
+    tenants=len(schemas),
+    migrations=len(plan),
+    fast_migrations=len(fast_plan),
+    statements=len(statements),
+)
+
+for position, schema in enumerate(fast_schemas[1:], 2):
+    schema_started = time.perf_counter()
+    exit_code = 0
+    try:
+        _apply_fast(schema, statements, fast_plan, emit_signal)
+    except Exception as e:
+        exit_code = 1
+        failed.append(schema)
+        print(f"❌ {schema} 快速套用失敗，已回滾: {e}")
+    seconds = time.perf_counter() - schema_started
+    if exit_code == 0:
+        print(f"[{position}/{len(fast_schemas)}] {schema} 快速套用完成 ({seconds:.2f}s)")
+    _event("result", schema=schema, mode="fast", seconds=round(seconds, 3), exit_code=exit_code)
+
+for position, schema in enumerate(normal_schemas, 1):
+    if schema in failed:
+        continue
+    schema_started = time.perf_counter()
+    exit_code = 0
+    try:
+        _apply_normal(schema)
+    except Exception as e:
+        exit_code = 1
+        failed.append(schema)
+        print(f"❌ {schema} 遷移失敗: {e}")
+    seconds = time.perf_counter() - schema_started
+    if exit_code == 0:
+        print(f"[{position}/{len(normal_schemas)}] {schema} 一般路徑遷移完成 ({seconds:.2f}s)")
+    _event("result", schema=schema, mode="normal", seconds=round(seconds, 3), exit_code=exit_code)
+
+connection.set_schema_to_public()
+print(f"\n完成，共耗時 {time.perf_counter() - started:.2f}s，失敗 {len(failed)} 個租戶")
+if failed:
+    print("失敗的租戶: " + ", ".join(failed))
+    sys.exit(1)
+'''
+
+
+def migrate_schemas_fast(project_dir, venv_activate, env_vars=None):
+    """
+    快速遷移所有租戶（結構相同的租戶共用一次產生的 SQL）
+
+    以最大一組已套用遷移相同的租戶為準，先以一般方式套用到其中一個參考租戶並擷取
+    實際執行的 SQL，再以同一個連線切換 search_path 重播到其他租戶，每個租戶各自一個交易。
+    含 RunPython 或非 atomic 的遷移及其後的遷移，以及結構不同的租戶，
+    會改用一般的 migrate_schemas 路徑。
+    """
+    return run_django_script(
+        MIGRATE_FAST_SCRIPT,
+        title="Django Migrate All Schemas (Fast)",
+        action="migrate_fast",
+        project_dir=project_dir,
         venv_activate=venv_activate,
         env_vars=env_vars,
-        admin=True,  # 使用管理員權限
     )
 
 
@@ -433,6 +1148,8 @@ def create_tenant_superuser(schema, project_dir, venv_activate, env_vars=None):
     return create_bat_and_run(
         [f"python manage.py tenant_command createsuperuser --schema={schema}"],
         title=f"Create Superuser for {schema}",
+        action="createsuperuser",
+        schema=schema,
         wait=True,
         directory=project_dir,
         venv_activate=venv_activate,
@@ -446,6 +1163,7 @@ def collectstatic(project_dir, venv_activate, env_vars=None):
     return create_bat_and_run(
         ["python manage.py collectstatic --noinput"],
         title="Django Collectstatic",
+        action="collectstatic",
         wait=True,
         directory=project_dir,
         venv_activate=venv_activate,
@@ -470,16 +1188,540 @@ def open_venv_shell(project_dir, venv_activate, env_vars=None):
             "cmd /k",  # 保持命令窗口開啟
         ],
         title="Django venv Shell",
+        action="venv_shell",
         directory=project_dir,
         venv_activate=venv_activate,
         env_vars=env_vars,
         admin=True,  # 使用管理員權限
+        instrument=False,  # 互動式視窗，只有說明用的 echo 命令
     )
 
 
+# 檢查結果快取相關函數
+def _file_sha256(path):
+    """計算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_source_manifest(project_dir, env_file=None, venv_dir=None, previous=None):
+    """
+    掃描專案的 Python 原始碼與設定文件，返回 {路徑: [mtime_ns, 大小, sha256]}
+
+    mtime 與大小都未變的文件直接沿用 previous 中的雜湊，避免重新讀取。
+    虛擬環境目錄不會被掃描，改以 site-packages 的修改時間代表已安裝套件的變化。
+    """
+    previous = previous or {}
+    manifest = {}
+
+    def add_file(key, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        cached = previous.get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            manifest[key] = cached
+        else:
+            manifest[key] = [stat.st_mtime_ns, stat.st_size, _file_sha256(path)]
+
+    for root, dirs, files in os.walk(project_dir):
+        # 略過虛擬環境與不影響檢查結果的目錄
+        dirs[:] = sorted(
+            name
+            for name in dirs
+            if name not in FINGERPRINT_SKIP_DIRS
+            and not os.path.exists(os.path.join(root, name, "pyvenv.cfg"))
+        )
+        for name in sorted(files):
+            if name.endswith(FINGERPRINT_EXTENSIONS):
+                path = os.path.join(root, name)
+                add_file(os.path.relpath(path, project_dir), path)
+
+    if env_file:
+        add_file(f"<env>{env_file}", env_file)
+
+    if venv_dir:
+        site_packages = os.path.join(venv_dir, "Lib", "site-packages")
+        try:
+            manifest["<site-packages>"] = [os.stat(site_packages).st_mtime_ns, 0, ""]
+        except OSError:
+            pass
+
+    return manifest
+
+
+def _manifest_fingerprint(manifest):
+    """由各文件的雜湊計算整體指紋"""
+    digest = hashlib.sha256()
+    for key in sorted(manifest):
+        mtime_ns, _, sha256 = manifest[key]
+        # 沒有內容雜湊的項目（例如 site-packages）以修改時間代表
+        digest.update(f"{key}\0{sha256 or mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _manifest_changes(old_manifest, new_manifest):
+    """列出兩次掃描間新增、刪除及修改的文件"""
+    changes = []
+    for key in sorted(set(old_manifest) | set(new_manifest)):
+        if key not in old_manifest:
+            changes.append(f"新增 {key}")
+        elif key not in new_manifest:
+            changes.append(f"刪除 {key}")
+        elif _manifest_fingerprint({key: old_manifest[key]}) != _manifest_fingerprint(
+            {key: new_manifest[key]}
+        ):
+            changes.append(f"修改 {key}")
+    return changes
+
+
+def _load_check_cache():
+    cache_path = os.path.join(BASE_DIR, CHECK_CACHE_FILE_NAME)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_check_cache(cache):
+    cache_path = os.path.join(BASE_DIR, CHECK_CACHE_FILE_NAME)
+    try:
+        with open(cache_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(cache_path + ".tmp", cache_path)
+    except OSError:
+        pass
+
+
+def _is_cacheable_result(check_name, exit_code, output):
+    """
+    判斷檢查結果是否可以快取
+
+    成功的結果都可快取；makemigrations --check 偵測到未建立的遷移時會以結束碼 1
+    輸出 "Migrations for ..." 報告，這同樣只取決於原始碼，也可快取。
+    其他失敗（Traceback、資料庫連線錯誤等）可能來自指紋未涵蓋的原因，不會快取。
+    """
+    if exit_code == 0:
+        return True
+    return (
+        check_name == "makemigrations"
+        and exit_code == 1
+        and "Migrations for " in output
+        and "Traceback" not in output
+    )
+
+
+def run_cached_check(
+    check_name,
+    manage_args,
+    project_dir,
+    venv_python,
+    env_file=None,
+    venv_dir=None,
+    force=False,
+):
+    """
+    執行 manage.py 檢查命令，並依原始碼指紋快取結果
+
+    原始碼與設定未變更時直接返回上次的結果；
+    否則重新執行，並記錄是哪些文件使快取失效。
+    只快取 _is_cacheable_result 認可的結果。
+    """
+    run_id = new_run_id()
+    action = f"check_{check_name}"
+    started = time.time()
+    emit_event("start", run_id, action, commands=[" ".join(manage_args)])
+
+    project_key = os.path.abspath(project_dir)
+    cache = _load_check_cache()
+    entry = cache.get(project_key, {}).get(check_name)
+    manifest = build_source_manifest(
+        project_dir, env_file, venv_dir, previous=entry and entry.get("manifest")
+    )
+    fingerprint = _manifest_fingerprint(manifest)
+    label = f"manage.py {' '.join(manage_args)}"
+
+    if (
+        entry
+        and entry.get("fingerprint") == fingerprint
+        and _is_cacheable_result(check_name, entry.get("exit_code"), entry["output"])
+        and not force
+    ):
+        exit_code = entry["exit_code"]
+        seconds = time.time() - started
+        emit_event("result", run_id, action, cached=True, exit_code=exit_code)
+        emit_event("end", run_id, action, exit_code=exit_code, seconds=round(seconds, 3))
+        return exit_code == 0, (
+            f"{label}（原始碼未變更，使用 {entry['checked_at']} 的快取結果，"
+            f"{seconds:.2f}s）\n{entry['output']}"
+        )
+
+    changes = _manifest_changes(entry["manifest"], manifest) if entry else []
+
+    try:
+        env = dict(os.environ, PYTHONIOENCODING="utf-8")
+        result = subprocess.run(
+            [venv_python or "python", "manage.py"] + list(manage_args),
+            cwd=project_dir,
+            env=env,
+            capture_output=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except Exception as e:
+        emit_event("end", run_id, action, exit_code=-1, error=str(e))
+        return False, f"執行 {label} 時發生錯誤: {e}"
+
+    exit_code = result.returncode
+    output = (result.stdout + result.stderr).strip()
+
+    if _is_cacheable_result(check_name, exit_code, output):
+        cache.setdefault(project_key, {})[check_name] = {
+            "fingerprint": fingerprint,
+            "manifest": manifest,
+            "exit_code": exit_code,
+            "output": output,
+            "checked_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "invalidated_by": changes,
+        }
+        _save_check_cache(cache)
+
+    seconds = time.time() - started
+    emit_event("result", run_id, action, cached=False, exit_code=exit_code)
+    emit_event("end", run_id, action, exit_code=exit_code, seconds=round(seconds, 3))
+
+    message = f"{label}（{seconds:.2f}s）"
+    if changes:
+        shown = "\n".join(f"  - {change}" for change in changes[:20])
+        more = f"\n  ...及其他 {len(changes) - 20} 個文件" if len(changes) > 20 else ""
+        message += f"\n快取因以下文件變更而失效:\n{shown}{more}"
+    return exit_code == 0, f"{message}\n{output}"
+
+
+def run_system_check(project_dir, venv_python, env_file=None, venv_dir=None):
+    """執行 manage.py check（依原始碼指紋快取）"""
+    return run_cached_check(
+        "check", ["check"], project_dir, venv_python, env_file, venv_dir
+    )
+
+
+def run_makemigrations_check(project_dir, venv_python, env_file=None, venv_dir=None):
+    """執行 makemigrations --check --dry-run（依原始碼指紋快取）"""
+    return run_cached_check(
+        "makemigrations",
+        ["makemigrations", "--check", "--dry-run"],
+        project_dir,
+        venv_python,
+        env_file,
+        venv_dir,
+    )
+
+
+# 啟動效能分析相關函數
+# 在 -X importtime 下執行 django.setup()，並記錄每個 AppConfig 的載入、模型匯入與 ready() 時間
+STARTUP_PROFILE_SCRIPT = r'''
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.getcwd())
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", SETTINGS_MODULE)
+
+from django.apps.config import AppConfig
+
+timings = {}
+original_create = AppConfig.create.__func__
+
+
+def _timed(record, key, function):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record[key] = time.perf_counter() - started
+
+    return wrapper
+
+
+def create(cls, entry):
+    started = time.perf_counter()
+    app_config = original_create(cls, entry)
+    record = timings.setdefault(app_config.label, {"name": app_config.name})
+    record["create"] = time.perf_counter() - started
+    app_config.import_models = _timed(record, "models", app_config.import_models)
+    app_config.ready = _timed(record, "ready", app_config.ready)
+    return app_config
+
+
+AppConfig.create = classmethod(create)
+
+started = time.perf_counter()
+import django
+
+django.setup()
+total = time.perf_counter() - started
+print(MARKER + json.dumps({"setup_seconds": total, "apps": timings}))
+'''
+
+
+def find_settings_module(project_dir):
+    """從環境變數或 manage.py 中取得 DJANGO_SETTINGS_MODULE"""
+    if os.environ.get("DJANGO_SETTINGS_MODULE"):
+        return os.environ["DJANGO_SETTINGS_MODULE"]
+
+    try:
+        with open(os.path.join(project_dir, "manage.py"), "r", encoding="utf-8") as f:
+            match = re.search(
+                r"DJANGO_SETTINGS_MODULE['\"]\s*,\s*['\"]([\w.]+)['\"]", f.read()
+            )
+        return match.group(1) if match else None
+    except OSError:
+        return None
+
+
+def parse_importtime(stderr):
+    """
+    解析 -X importtime 的輸出，返回依巢狀關係建立的模組樹
+
+    importtime 會在子模組之後才輸出父模組，因此以堆疊將較深層的項目
+    掛到下一個較淺層的項目之下。
+    """
+    pattern = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\| ( *)(\S+)")
+    pending = []
+    for line in stderr.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        level = len(indent) // 2
+        node = {
+            "name": name,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "children": [],
+        }
+        while pending and pending[-1][0] > level:
+            node["children"].insert(0, pending.pop()[1])
+        pending.append((level, node))
+
+    return [node for _, node in pending]
+
+
+def _flatten_modules(nodes, modules=None):
+    modules = {} if modules is None else modules
+    for node in nodes:
+        modules[node["name"]] = {
+            "self_us": node["self_us"],
+            "cumulative_us": node["cumulative_us"],
+        }
+        _flatten_modules(node["children"], modules)
+    return modules
+
+
+def format_import_tree(nodes, threshold_us=10000, depth=0, max_depth=4):
+    """將模組樹依累計時間排序，輸出超過門檻的項目"""
+    lines = []
+    for node in sorted(nodes, key=lambda item: item["cumulative_us"], reverse=True):
+        if node["cumulative_us"] < threshold_us:
+            break
+        lines.append(
+            f"{'  ' * depth}{node['cumulative_us'] / 1000:8.1f} ms  "
+            f"(自身 {node['self_us'] / 1000:.1f} ms)  {node['name']}"
+        )
+        if depth + 1 < max_depth:
+            lines += format_import_tree(
+                node["children"], threshold_us, depth + 1, max_depth
+            )
+    return lines
+
+
+def _latest_startup_profile(profile_dir, project_dir):
+    """找出同一專案最近一次的分析結果"""
+    try:
+        names = sorted(os.listdir(profile_dir), reverse=True)
+    except OSError:
+        return None
+
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(profile_dir, name), "r", encoding="utf-8") as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if profile.get("project_dir") == os.path.abspath(project_dir):
+            return profile
+    return None
+
+
+def profile_startup(project_dir, venv_python, top=20):
+    """
+    分析 Django 專案的啟動時間
+
+    以虛擬環境的 Python 加上 -X importtime 執行 django.setup()，
+    列出最慢的模組與 AppConfig，並將結果保存到 startup_profiles 目錄，
+    與同一專案上一次的結果比較。
+    """
+    run_id = new_run_id()
+    started = time.time()
+    emit_event("start", run_id, "profile_startup")
+
+    settings_module = find_settings_module(project_dir)
+    if not settings_module:
+        emit_event("end", run_id, "profile_startup", exit_code=-1)
+        return False, "找不到 DJANGO_SETTINGS_MODULE，請確認 manage.py 或 .env 設定"
+
+    try:
+        with tempfile.NamedTemporaryFile(
+            suffix=".py", delete=False, mode="w", encoding="utf-8"
+        ) as script_file:
+            script_path = script_file.name
+            script_file.write(f"SETTINGS_MODULE = {settings_module!r}\n")
+            script_file.write(f"MARKER = {STARTUP_PROFILE_MARKER!r}\n")
+            script_file.write(STARTUP_PROFILE_SCRIPT)
+
+        result = subprocess.run(
+            [venv_python or "python", "-X", "importtime", script_path],
+            cwd=project_dir,
+            env=dict(os.environ, PYTHONIOENCODING="utf-8"),
+            capture_output=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+    except Exception as e:
+        emit_event("end", run_id, "profile_startup", exit_code=-1, error=str(e))
+        return False, f"執行啟動分析時發生錯誤: {e}"
+    finally:
+        try:
+            os.remove(script_path)
+        except (OSError, NameError):
+            pass
+
+    wall_seconds = time.time() - started
+    marker_lines = [
+        line
+        for line in result.stdout.splitlines()
+        if line.startswith(STARTUP_PROFILE_MARKER)
+    ]
+    if result.returncode != 0 or not marker_lines:
+        emit_event("end", run_id, "profile_startup", exit_code=result.returncode or 1)
+        errors = [
+            line
+            for line in result.stderr.splitlines()
+            if not line.startswith("import time:")
+        ]
+        return False, "django.setup() 執行失敗:\n" + "\n".join(errors[-20:])
+
+    setup = json.loads(marker_lines[-1][len(STARTUP_PROFILE_MARKER) :])
+    tree = parse_importtime(result.stderr)
+    modules = _flatten_modules(tree)
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_dir,
+            capture_output=True,
+            encoding="utf-8",
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    commit = commit or "nogit"
+
+    profile = {
+        "project_dir": os.path.abspath(project_dir),
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "wall_seconds": wall_seconds,
+        "setup_seconds": setup["setup_seconds"],
+        "apps": setup["apps"],
+        "modules": modules,
+        "tree": tree,
+    }
+
+    # 與上一次的結果比較後再保存
+    profile_dir = os.path.join(BASE_DIR, STARTUP_PROFILE_DIR_NAME)
+    previous = _latest_startup_profile(profile_dir, project_dir)
+    profile_path = os.path.join(
+        profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{commit}.json"
+    )
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        with open(profile_path, "w", encoding="utf-8") as f:
+            json.dump(profile, f, ensure_ascii=False)
+    except OSError as e:
+        profile_path = f"（保存失敗: {e}）"
+
+    lines = [
+        f"django.setup() {setup['setup_seconds']:.2f}s，"
+        f"整體 {wall_seconds:.2f}s（commit {commit}）",
+        "",
+        "=== 模組匯入樹（累計時間 >= 10 ms）===",
+    ]
+    lines += format_import_tree(tree)
+
+    lines += ["", f"=== 自身耗時最長的 {top} 個模組 ==="]
+    slowest = sorted(modules.items(), key=lambda item: item[1]["self_us"], reverse=True)
+    for name, timing in slowest[:top]:
+        lines.append(f"{timing['self_us'] / 1000:8.1f} ms  {name}")
+
+    lines += ["", "=== AppConfig 耗時（載入 / 模型匯入 / ready）==="]
+    app_totals = sorted(
+        setup["apps"].items(),
+        key=lambda item: sum(
+            item[1].get(key, 0) for key in ("create", "models", "ready")
+        ),
+        reverse=True,
+    )
+    for label, timing in app_totals:
+        lines.append(
+            f"{sum(timing.get(key, 0) for key in ('create', 'models', 'ready')) * 1000:8.1f} ms  "
+            f"{label} ({timing.get('create', 0) * 1000:.1f} / "
+            f"{timing.get('models', 0) * 1000:.1f} / {timing.get('ready', 0) * 1000:.1f})"
+        )
+
+    if previous:
+        delta = setup["setup_seconds"] - previous["setup_seconds"]
+        lines += [
+            "",
+            f"=== 與上一次（{previous['created_at']}，commit {previous['commit']}）比較 ===",
+            f"django.setup() {delta:+.2f}s",
+        ]
+        changes = []
+        for name in set(modules) | set(previous.get("modules", {})):
+            now = modules.get(name, {}).get("self_us", 0)
+            before = previous.get("modules", {}).get(name, {}).get("self_us", 0)
+            if now != before:
+                changes.append((now - before, name))
+        for change, name in sorted(changes, key=lambda item: abs(item[0]), reverse=True)[:10]:
+            lines.append(f"{change / 1000:+8.1f} ms  {name}")
+
+    lines += ["", f"結果已保存: {profile_path}"]
+
+    emit_event(
+        "end",
+        run_id,
+        "profile_startup",
+        exit_code=0,
+        seconds=round(wall_seconds, 3),
+        setup_seconds=round(setup["setup_seconds"], 3),
+    )
+    return True, "\n".join(lines)
+
+
 # DNS 管理相關函數
 def create_dns_management_tool():
     """創建並啟動本地 DNS 管理工具"""
+    run_id = new_run_id()
+    emit_event("start", run_id, "dns_tool")
+
     # 使用臨時文件而不是固定文件，避免重複執行的問題
     try:
         with tempfile.NamedTemporaryFile(
@@ -591,12 +1833,26 @@ exit
     except Exception as e:
         success = False
         message = f"啟動 DNS 管理工具時發生錯誤: {e}"
+        emit_event("end", run_id, "dns_tool", exit_code=-1, error=str(e))
 
     return success, message
 
 
 def inspect_tenants(project_dir, venv_activate):
     """檢查所有租戶的狀態（確保視窗不會自動關閉）"""
+    run_id = new_run_id()
+    emit_event("start", run_id, "inspect_tenants")
+    progress_line = bat_event_lines(
+        "progress", run_id, "inspect_tenants", save_as=["TOOLBOX_RUN_START"]
+    )
+    end_line = bat_event_lines(
+        "end",
+        run_id,
+        "inspect_tenants",
+        exit_code="%ERRORLEVEL%",
+        since="TOOLBOX_RUN_START",
+    )
+
     try:
         # 創建一個批處理文件
         with tempfile.NamedTemporaryFile(
@@ -615,6 +1871,7 @@ if exist "{venv_activate}" (
     call "{venv_activate}"
 )
 
+{progress_line}
 echo === 執行租戶檢查 ===
 echo.
 echo === 公共租戶名稱 ===
@@ -637,11 +1894,13 @@ python manage.py shell -c "from django_tenants.utils import get_tenant_model; te
 echo.
 echo 對每個非公共租戶執行檢查...
 python manage.py tenant_command shell -c "from django.contrib.auth import get_user_model; print(f'當前租戶超級使用者: {{\\\"、\\\".join([u.username for u in get_user_model().objects.filter(is_superuser=True)])}}')" --schema=tenant1
+{end_line}
 echo.
 echo === 檢查完成 ===
 echo.
 echo 請按任意鍵關閉此視窗...
 pause > nul
+(goto) 2>nul & del "%~f0"
 """
             )
 
@@ -650,23 +1909,577 @@ pause > nul
         admin_cmd = f'powershell -Command "Start-Process cmd -ArgumentList \'/K "{batch_path}"\'  -Verb RunAs"'
         subprocess.Popen(admin_cmd, shell=True)
 
-        # 一段時間後刪除臨時文件
-        def delete_temp_file():
-            time.sleep(10)  # 給足夠時間執行
-            try:
-                if os.path.exists(batch_path):
-                    os.remove(batch_path)
-            except:
-                pass
-
-        threading.Thread(target=delete_temp_file, daemon=True).start()
-
+        # .bat 會在最後一行刪除自己，不能在執行期間從外部刪除
         return True, "已啟動租戶檢查，請查看新開啟的視窗"
 
     except Exception as e:
+        emit_event("end", run_id, "inspect_tenants", exit_code=-1, error=str(e))
         return False, f"啟動租戶檢查時發生錯誤: {str(e)}"
 
 
+# 結構差異檢查腳本：以少數幾個系統目錄查詢取得所有租戶的結構，計算指紋並分組比較
+SCHEMA_DRIFT_SCRIPT = r'''
+import hashlib
+import re
+
+from django.db import connection
+from django_tenants.utils import get_public_schema_name, get_tenant_model
+
+CATALOG_QUERIES = {
+    "column": """
+        SELECT n.nspname, c.relname, a.attname,
+               format_type(a.atttypid, a.atttypmod)
+               || CASE WHEN a.attnotnull THEN ' NOT NULL' ELSE '' END
+               || COALESCE(' DEFAULT ' || pg_get_expr(d.adbin, d.adrelid), '')
+        FROM pg_attribute a
+        JOIN pg_class c ON c.oid = a.attrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+        WHERE n.nspname = ANY(%s) AND c.relkind IN ('r', 'p')
+          AND a.attnum > 0 AND NOT a.attisdropped
+    """,
+    "index": """
+        SELECT schemaname, tablename, indexname, indexdef
+        FROM pg_indexes
+        WHERE schemaname = ANY(%s)
+    """,
+    "constraint": """
+        SELECT n.nspname, c.relname, con.conname,
+               con.contype::text || ' ' || pg_get_constraintdef(con.oid)
+        FROM pg_constraint con
+        JOIN pg_class c ON c.oid = con.conrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = ANY(%s)
+    """,
+}
+
+
+def _normalize(schema, definition):
+    """移除定義中的 schema 前綴，使不同租戶的相同結構可以比較"""
+    pattern = r'(?<![\w"])"?' + re.escape(schema) + r'"?\.'
+    return re.sub(pattern, "", definition or "")
+
+
+started = time.perf_counter()
+public_schema = get_public_schema_name()
+schemas = sorted(
+    get_tenant_model()
+    .objects.exclude(schema_name=public_schema)
+    .values_list("schema_name", flat=True)
+)
+structures = {schema: set() for schema in schemas}
+
+with connection.cursor() as cursor:
+    for kind, query in CATALOG_QUERIES.items():
+        cursor.execute(query, [schemas])
+        for schema, table, name, definition in cursor.fetchall():
+            items = structures[schema]
+            items.add(f"table {table}")
+            items.add(f"{kind} {table}.{name}: {_normalize(schema, definition)}")
+
+groups = {}
+for schema, items in structures.items():
+    fingerprint = hashlib.sha256("\n".join(sorted(items)).encode("utf-8")).hexdigest()[:12]
+    groups.setdefault(fingerprint, []).append(schema)
+
+ordered = sorted(groups.items(), key=lambda item: len(item[1]), reverse=True)
+print(f"已檢查 {len(schemas)} 個租戶，共 {len(groups)} 種結構（{time.perf_counter() - started:.2f}s）\n")
+for fingerprint, members in ordered:
+    sample = ", ".join(members[:5]) + (" ..." if len(members) > 5 else "")
+    print(f"  {fingerprint}: {len(members)} 個租戶 ({sample})")
+
+majority_fingerprint, majority = ordered[0] if ordered else (None, [])
+reference = structures[majority[0]] if majority else set()
+for fingerprint, members in ordered:
+    exit_code = 0 if fingerprint == majority_fingerprint else 1
+    for schema in members:
+        _event("result", schema=schema, fingerprint=fingerprint, exit_code=exit_code)
+
+for fingerprint, members in ordered[1:]:
+    items = structures[members[0]]
+    missing = sorted(reference - items)
+    extra = sorted(items - reference)
+    print(f"\n=== 與多數租戶（{majority_fingerprint}）不同: {', '.join(members)} ===")
+    for label, differences in (("缺少", missing), ("多出", extra)):
+        for difference in differences[:50]:
+            print(f"  {label} {difference}")
+        if len(differences) > 50:
+            print(f"  ...及其他 {len(differences) - 50} 項{label}的定義")
+
+if len(groups) > 1:
+    print(f"\n❌ 發現 {len(schemas) - len(majority)} 個租戶的結構與多數租戶不同")
+    sys.exit(1)
+print("\n✅ 所有租戶結構一致")
+'''
+
+
+def detect_schema_drift(project_dir, venv_activate, env_vars=None):
+    """
+    檢查租戶間的結構差異
+
+    以少數幾個系統目錄查詢讀取所有租戶的資料表、欄位、索引與約束，
+    為每個租戶計算結構指紋並分組，列出與多數租戶不同的租戶及其差異。
+    """
+    return run_django_script(
+        SCHEMA_DRIFT_SCRIPT,
+        title="Tenant Schema Drift Check",
+        action="schema_drift",
+        project_dir=project_dir,
+        venv_activate=venv_activate,
+        env_vars=env_vars,
+    )
+
+
+# 負載測試相關函數
+# 資料填充腳本：建立 N 個租戶與域名，並平行為每個租戶填入合成資料
+SEED_TENANTS_SCRIPT = r'''
+import datetime
+import decimal
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, models
+from django.utils import timezone
+from django_tenants.utils import get_tenant_domain_model, get_tenant_model
+
+TenantModel = get_tenant_model()
+DomainModel = get_tenant_domain_model()
+SKIP = object()
+BASE_DATETIME = datetime.datetime(2024, 1, 1)
+
+
+def _fake_value(field, rng, index):
+    """依欄位類型產生可重現的合成值，無法產生時返回 SKIP"""
+    if field.choices:
+        return rng.choice([value for value, _ in field.flatchoices])
+    if isinstance(field, models.BooleanField):
+        return rng.random() < 0.5
+    if isinstance(field, models.UUIDField):
+        return uuid.UUID(int=rng.getrandbits(128))
+    if isinstance(field, models.EmailField):
+        return f"user{index}.{rng.randrange(16 ** 6):06x}@example.com"
+    if isinstance(field, models.URLField):
+        return f"https://example.com/{index}/{rng.randrange(16 ** 6):06x}"
+    if isinstance(field, models.GenericIPAddressField):
+        return f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+    if isinstance(field, (models.CharField, models.TextField)):
+        text = f"{field.name}-{index}-{rng.randrange(16 ** 8):08x}"
+        return text[: field.max_length] if field.max_length else text
+    if isinstance(field, models.DecimalField):
+        limit = min(10 ** (field.max_digits - field.decimal_places) - 1, 10 ** 6)
+        quantum = decimal.Decimal(1).scaleb(-field.decimal_places)
+        return decimal.Decimal(str(rng.uniform(0, limit))).quantize(quantum)
+    if isinstance(field, (models.SmallIntegerField, models.PositiveSmallIntegerField)):
+        return rng.randint(0, 32767)
+    if isinstance(field, models.IntegerField):
+        return rng.randint(0, 2 ** 31 - 1)
+    if isinstance(field, models.FloatField):
+        return rng.uniform(0, 10 ** 6)
+    if isinstance(field, models.DateTimeField):
+        value = BASE_DATETIME + datetime.timedelta(seconds=rng.randrange(365 * 86400))
+        return timezone.make_aware(value) if settings.USE_TZ else value
+    if isinstance(field, models.DateField):
+        return BASE_DATETIME.date() + datetime.timedelta(days=rng.randrange(365))
+    if isinstance(field, models.TimeField):
+        return datetime.time(rng.randrange(24), rng.randrange(60), rng.randrange(60))
+    if isinstance(field, models.DurationField):
+        return datetime.timedelta(seconds=rng.randrange(86400))
+    if isinstance(field, getattr(models, "JSONField", ())):
+        return {"seed": index, "value": rng.randrange(10 ** 6)}
+    if isinstance(field, models.BinaryField):
+        return bytes(rng.getrandbits(8) for _ in range(16))
+    return SKIP
+
+
+def _value_fields(model, exclude=()):
+    """需要填值的非關聯欄位（略過自動主鍵、有預設值及自動時間欄位）"""
+    fields = []
+    for field in model._meta.concrete_fields:
+        if field.name in exclude or field.is_relation:
+            continue
+        if isinstance(field, models.AutoField) or field.has_default():
+            continue
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            continue
+        fields.append(field)
+    return fields
+
+
+def _relation_fields(model):
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if field.is_relation and (field.many_to_one or field.one_to_one)
+    ]
+
+
+def _build_kwargs(model, rng, index, fk_choices, exclude=()):
+    kwargs = {}
+    for field in _value_fields(model, exclude):
+        value = _fake_value(field, rng, index)
+        if value is not SKIP:
+            kwargs[field.attname] = value
+    for field in _relation_fields(model):
+        choices = fk_choices.get(field.name)
+        kwargs[field.attname] = rng.choice(choices) if choices else None
+    return kwargs
+
+
+def _is_seedable(model):
+    """檢查所有必填欄位都能產生合成值"""
+    probe = random.Random(0)
+    for field in _value_fields(model):
+        if not field.null and _fake_value(field, probe, 0) is SKIP:
+            return False
+    return True
+
+
+def _tenant_models():
+    """TENANT_APPS 中的模型，依外鍵相依排序"""
+    tenant_apps = getattr(settings, "TENANT_APPS", [])
+    labels = PARAMS.get("apps") or []
+    selected = []
+    for app_config in apps.get_app_configs():
+        if labels:
+            if app_config.label not in labels:
+                continue
+        elif app_config.name.startswith("django.") or not any(
+            entry == app_config.name or entry.startswith(app_config.name + ".apps.")
+            for entry in tenant_apps
+        ):
+            continue
+        for model in app_config.get_models():
+            meta = model._meta
+            if meta.proxy or not meta.managed or model in (TenantModel, DomainModel):
+                continue
+            if _is_seedable(model):
+                selected.append(model)
+            else:
+                print(f"⚠️ 略過 {meta.label}: 有無法產生合成值的必填欄位")
+
+    ordered, visited = [], set()
+
+    def visit(model, stack):
+        if model in visited or model in stack:
+            return
+        stack.add(model)
+        for field in _relation_fields(model):
+            if field.related_model in selected and field.related_model is not model:
+                visit(field.related_model, stack)
+        visited.add(model)
+        ordered.append(model)
+
+    for model in selected:
+        visit(model, set())
+    return ordered
+
+
+def _create_tenant(index):
+    schema = f"{PARAMS['prefix']}{index:04d}"
+    tenant = TenantModel.objects.filter(schema_name=schema).first()
+    if tenant is None:
+        rng = random.Random(f"{PARAMS['seed']}:tenant:{schema}")
+        tenant = TenantModel(
+            schema_name=schema,
+            **_build_kwargs(TenantModel, rng, index, {}, exclude=("schema_name",)),
+        )
+        tenant.save()
+    DomainModel.objects.get_or_create(
+        domain=f"{schema}{PARAMS['domain_suffix']}",
+        defaults={"tenant": tenant, "is_primary": True},
+    )
+    return schema
+
+
+def _seed_schema(schema):
+    started = time.perf_counter()
+    total_rows = 0
+    pk_cache = {}
+    batch_size = PARAMS["batch_size"]
+    rows_per_model = PARAMS["rows"]
+    try:
+        connection.set_schema(schema)
+        for model in seed_models:
+            manager = model._default_manager
+            fk_choices = {}
+            for field in _relation_fields(model):
+                target = field.related_model
+                choices = pk_cache.get(target) or list(
+                    target._default_manager.order_by("pk").values_list("pk", flat=True)[
+                        :1000
+                    ]
+                )
+                if not choices and not field.null:
+                    fk_choices = None
+                    break
+                fk_choices[field.name] = choices
+            if fk_choices is None:
+                print(f"⚠️ {schema}: 略過 {model._meta.label}，關聯的必填資料不存在")
+                continue
+
+            rng = random.Random(f"{PARAMS['seed']}:{schema}:{model._meta.label}")
+            before = manager.count()
+            for start in range(0, rows_per_model, batch_size):
+                stop = min(start + batch_size, rows_per_model)
+                objs = [
+                    model(**_build_kwargs(model, rng, index, fk_choices))
+                    for index in range(start, stop)
+                ]
+                # 唯一值衝突的資料直接略過，實際筆數以前後 count 計算
+                manager.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
+            total_rows += manager.count() - before
+            # 依主鍵排序，確保相同種子會選到相同的外鍵目標
+            pk_cache[model] = list(
+                manager.order_by("pk").values_list("pk", flat=True)[:1000]
+            )
+    finally:
+        connection.close()
+    return total_rows, time.perf_counter() - started
+
+
+started = time.perf_counter()
+connection.set_schema_to_public()
+print(f"正在建立 {PARAMS['count']} 個租戶（已存在的租戶會直接沿用）...")
+schemas = []
+for index in range(1, PARAMS["count"] + 1):
+    tenant_started = time.perf_counter()
+    schemas.append(_create_tenant(index))
+    print(f"[{index}/{PARAMS['count']}] {schemas[-1]} ({time.perf_counter() - tenant_started:.2f}s)")
+tenants_seconds = time.perf_counter() - started
+
+seed_models = _tenant_models()
+print(f"\n將為每個租戶的 {len(seed_models)} 個模型各填入 {PARAMS['rows']} 筆資料，平行數 {PARAMS['workers']}")
+_event("progress", stage="seed", tenants=len(schemas), models=len(seed_models))
+
+seed_started = time.perf_counter()
+total_rows = 0
+failed = []
+
+
+def _run(schema):
+    try:
+        rows, seconds = _seed_schema(schema)
+    except Exception as e:
+        print(f"❌ {schema} 填充失敗: {e}")
+        _event("result", schema=schema, exit_code=1, error=str(e))
+        return schema, None
+    print(f"{schema}: {rows} 筆, {seconds:.2f}s, {rows / seconds if seconds else 0:.0f} 筆/秒")
+    _event("result", schema=schema, rows=rows, seconds=round(seconds, 3), exit_code=0)
+    return schema, rows
+
+
+with ThreadPoolExecutor(max_workers=PARAMS["workers"]) as pool:
+    for schema, rows in pool.map(_run, schemas):
+        if rows is None:
+            failed.append(schema)
+        else:
+            total_rows += rows
+
+seed_seconds = time.perf_counter() - seed_started
+print(f"\n建立租戶耗時 {tenants_seconds:.2f}s")
+print(f"填充資料 {total_rows} 筆，耗時 {seed_seconds:.2f}s，{total_rows / seed_seconds if seed_seconds else 0:.0f} 筆/秒")
+if failed:
+    print("失敗的租戶: " + ", ".join(failed))
+    sys.exit(1)
+'''
+
+
+def seed_tenants(
+    count,
+    rows_per_model,
+    project_dir,
+    venv_activate,
+    env_vars=None,
+    prefix="loadtest",
+    seed=42,
+    workers=4,
+    batch_size=1000,
+    domain_suffix=".localhost",
+):
+    """
+    建立 N 個測試租戶（含域名），並為每個租戶的模型填入合成資料
+
+    租戶 schema 命名為 {prefix}0001、{prefix}0002...，已存在的租戶會直接沿用。
+    每個租戶與模型使用固定的亂數種子，相同參數可產生相同資料。
+    rows_per_model 為 0 時只建立租戶與域名，不填入資料。
+    """
+    if count <= 0 or rows_per_model < 0 or workers <= 0 or batch_size <= 0:
+        return False, (
+            "租戶數量、平行數與批次大小必須大於 0，"
+            "每個模型的資料筆數必須大於或等於 0（0 表示只建立租戶）"
+        )
+    if not re.match(r"^[a-z][a-z0-9_]*$", prefix):
+        return False, "schema 前綴只能包含小寫英文字母、數字與底線，且必須以字母開頭"
+
+    return run_django_script(
+        SEED_TENANTS_SCRIPT,
+        title="Seed Load Test Tenants",
+        action="seed_tenants",
+        project_dir=project_dir,
+        venv_activate=venv_activate,
+        env_vars=env_vars,
+        params={
+            "count": count,
+            "rows": rows_per_model,
+            "prefix": prefix,
+            "seed": seed,
+            "workers": workers,
+            "batch_size": batch_size,
+            "domain_suffix": domain_suffix,
+        },
+    )
+
+
+# 資料庫維護相關函數
+# 維護腳本：以固定大小的執行緒池，從最大的租戶開始執行 ANALYZE / VACUUM / REINDEX
+MAINTAIN_SCHEMAS_SCRIPT = r'''
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django_tenants.utils import get_public_schema_name, get_tenant_model
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _is_stale(live, dead, modified, never_analyzed):
+    if never_analyzed and live + modified > 0:
+        return True
+    if live + dead and dead / (live + dead) >= PARAMS["dead_ratio"]:
+        return True
+    return modified / max(live, 1) >= PARAMS["stale_ratio"]
+
+
+def _maintain(schema):
+    started = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            if PARAMS["reindex"]:
+                cursor.execute(f"REINDEX SCHEMA {_quote(schema)}")
+            # VACUUM 不能在交易中執行，Django 預設的 autocommit 模式可直接執行
+            command = "VACUUM (ANALYZE)" if PARAMS["vacuum"] else "ANALYZE"
+            for table in tables[schema]:
+                cursor.execute(f"{command} {_quote(schema)}.{_quote(table)}")
+    finally:
+        connection.close()
+    return time.perf_counter() - started
+
+
+started = time.perf_counter()
+public_schema = get_public_schema_name()
+schemas = list(
+    get_tenant_model()
+    .objects.exclude(schema_name=public_schema)
+    .values_list("schema_name", flat=True)
+)
+
+# 以一次查詢取得所有租戶資料表的大小與統計資訊
+tables, sizes, stale = {}, {}, {}
+with connection.cursor() as cursor:
+    cursor.execute(
+        """
+        SELECT schemaname, relname, n_live_tup, n_dead_tup, n_mod_since_analyze,
+               GREATEST(last_analyze, last_autoanalyze) IS NULL,
+               pg_total_relation_size(relid)
+        FROM pg_stat_user_tables
+        WHERE schemaname = ANY(%s)
+        """,
+        [schemas],
+    )
+    for schema, table, live, dead, modified, never_analyzed, size in cursor.fetchall():
+        tables.setdefault(schema, []).append(table)
+        sizes[schema] = sizes.get(schema, 0) + size
+        if _is_stale(live, dead, modified or 0, never_analyzed):
+            stale.setdefault(schema, []).append(table)
+
+targets = sorted(tables, key=lambda schema: sizes[schema], reverse=True)
+if PARAMS["only_stale"]:
+    targets = [schema for schema in targets if schema in stale]
+
+operations = (["REINDEX"] if PARAMS["reindex"] else []) + [
+    "VACUUM ANALYZE" if PARAMS["vacuum"] else "ANALYZE"
+]
+print(f"共 {len(schemas)} 個租戶，其中 {len(stale)} 個有統計過期或死元組過多的資料表")
+print(f"將對 {len(targets)} 個租戶執行 {' + '.join(operations)}，平行數 {PARAMS['workers']}（由大到小）\n")
+_event("progress", stage="maintain", tenants=len(targets), operations=operations)
+
+failed = []
+timings = []
+
+
+def _run(schema):
+    try:
+        seconds = _maintain(schema)
+    except Exception as e:
+        print(f"❌ {schema} 維護失敗: {e}")
+        _event("result", schema=schema, exit_code=1, error=str(e))
+        failed.append(schema)
+        return
+    timings.append((seconds, schema))
+    print(
+        f"{schema}: {len(tables[schema])} 張表, {sizes[schema] / 1024 / 1024:.1f} MB, "
+        f"過期 {len(stale.get(schema, []))} 張, {seconds:.2f}s"
+    )
+    _event("result", schema=schema, seconds=round(seconds, 3), exit_code=0)
+
+
+with ThreadPoolExecutor(max_workers=PARAMS["workers"]) as pool:
+    list(pool.map(_run, targets))
+
+print(f"\n完成，共耗時 {time.perf_counter() - started:.2f}s")
+if timings:
+    print("最耗時的租戶:")
+    for seconds, schema in sorted(timings, reverse=True)[:10]:
+        print(f"  {schema}: {seconds:.2f}s")
+if failed:
+    print("失敗的租戶: " + ", ".join(failed))
+    sys.exit(1)
+'''
+
+
+def maintain_schemas(
+    project_dir,
+    venv_activate,
+    env_vars=None,
+    vacuum=False,
+    reindex=False,
+    only_stale=False,
+    workers=4,
+    dead_ratio=0.2,
+    stale_ratio=0.1,
+):
+    """
+    對所有租戶 schema 執行 ANALYZE（可選 VACUUM 或 REINDEX）
+
+    以固定大小的執行緒池平行處理，從資料量最大的租戶開始。
+    only_stale 時只處理有資料表死元組比例 >= dead_ratio、
+    自上次 ANALYZE 後變更比例 >= stale_ratio，或從未 ANALYZE 的租戶。
+    """
+    if workers <= 0:
+        return False, "平行數必須大於 0"
+
+    return run_django_script(
+        MAINTAIN_SCHEMAS_SCRIPT,
+        title="Tenant Schema Maintenance",
+        action="maintain_schemas",
+        project_dir=project_dir,
+        venv_activate=venv_activate,
+        env_vars=env_vars,
+        params={
+            "vacuum": vacuum,
+            "reindex": reindex,
+            "only_stale": only_stale,
+            "workers": workers,
+            "dead_ratio": dead_ratio,
+            "stale_ratio": stale_ratio,
+        },
+    )
+
+
 def setup_environment():
     """設置環境並偵測項目路徑"""
     global PROJECT_DIR, VENV_DIR, VENV_PYTHON, VENV_ACTIVATE, ENV_FILE, ENV_VARS
@@ -735,6 +2548,13 @@ def show_menu():
 [6] collectstatic
 [7] 檢查所有租戶（superuser + migration）
 [8] 本地 DNS 管理工具（需要管理員權限）
+[9] migrate_schemas 快速模式（結構相同的租戶共用 SQL）
+[10] 建立負載測試租戶與合成資料
+[11] 租戶資料庫維護（ANALYZE / VACUUM / REINDEX）
+[12] manage.py check（原始碼未變更時使用快取）
+[13] makemigrations --check --dry-run（原始碼未變更時使用快取）
+[14] 檢查租戶間的結構差異
+[15] 分析 Django 啟動時間（import 與 AppConfig）
 [0] 進入虛擬環境終端機
 [x] 離開
 ===============================
@@ -742,6 +2562,18 @@ def show_menu():
     )
 
 
+def prompt_int(message, default):
+    """讀取整數輸入，直接按 Enter 使用預設值，輸入無效時返回 None"""
+    value = input(f"{message} [{default}]：").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"❌ 無效的數字: {value}")
+        return None
+
+
 def main():
     """主程序入口點"""
     # 設置環境
@@ -752,6 +2584,10 @@ def main():
         print("❌ 警告: 在項目目錄中找不到 manage.py!")
 
     while True:
+        # 如有設定 TOOLBOX_METRICS_FILE，每次回到選單時以新增的事件更新指標檔
+        if get_metrics_file():
+            export_metrics()
+
         show_menu()
         choice = input("請輸入選項編號：").strip().lower()
 
@@ -784,10 +2620,68 @@ def main():
         elif choice == "8":
             success, message = create_dns_management_tool()
             print(f"{'✅' if success else '❌'} {message}")
+        elif choice == "9":
+            success, message = migrate_schemas_fast(PROJECT_DIR, VENV_ACTIVATE, ENV_VARS)
+            print(f"{'✅' if success else '❌'} {message}")
+        elif choice == "10":
+            count = prompt_int("請輸入要建立的租戶數量", 10)
+            rows = (
+                prompt_int("請輸入每個模型的資料筆數（0 表示只建立租戶）", 1000)
+                if count is not None
+                else None
+            )
+            workers = prompt_int("請輸入平行處理數", 4) if rows is not None else None
+            if workers is None:
+                continue
+            success, message = seed_tenants(
+                count, rows, PROJECT_DIR, VENV_ACTIVATE, ENV_VARS, workers=workers
+            )
+            print(f"{'✅' if success else '❌'} {message}")
+        elif choice == "11":
+            print("維護模式：[1] ANALYZE  [2] VACUUM ANALYZE  [3] REINDEX + ANALYZE")
+            mode = input("請選擇維護模式 [1]：").strip() or "1"
+            if mode not in ("1", "2", "3"):
+                print("❌ 無效選項，請重新輸入")
+                continue
+            only_stale = (
+                input("只處理統計過期或死元組過多的租戶？(y/N)：").strip().lower() == "y"
+            )
+            workers = prompt_int("請輸入平行處理數", 4)
+            if workers is None:
+                continue
+            success, message = maintain_schemas(
+                PROJECT_DIR,
+                VENV_ACTIVATE,
+                ENV_VARS,
+                vacuum=mode == "2",
+                reindex=mode == "3",
+                only_stale=only_stale,
+                workers=workers,
+            )
+            print(f"{'✅' if success else '❌'} {message}")
+        elif choice == "12":
+            success, message = run_system_check(
+                PROJECT_DIR, VENV_PYTHON, ENV_FILE, VENV_DIR
+            )
+            print(f"{'✅' if success else '❌'} {message}")
+        elif choice == "13":
+            success, message = run_makemigrations_check(
+                PROJECT_DIR, VENV_PYTHON, ENV_FILE, VENV_DIR
+            )
+            print(f"{'✅' if success else '❌'} {message}")
+        elif choice == "14":
+            success, message = detect_schema_drift(PROJECT_DIR, VENV_ACTIVATE, ENV_VARS)
+            print(f"{'✅' if success else '❌'} {message}")
+        elif choice == "15":
+            success, message = profile_startup(PROJECT_DIR, VENV_PYTHON)
+            print(f"{'✅' if success else '❌'} {message}")
         elif choice == "0":
             success, message = open_venv_shell(PROJECT_DIR, VENV_ACTIVATE, ENV_VARS)
             print(f"{'✅' if success else '❌'} {message}")
         elif choice == "x":
+            if get_metrics_file():
+                success, message = export_metrics()
+                print(f"{'✅' if success else '❌'} {message}")
             print("👋 再見！")
             break
         else: